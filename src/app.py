@@ -3,15 +3,14 @@ import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 from flask import Flask, render_template, abort, request, redirect, url_for
-import asyncio
-try:
-    from playwright.async_api import async_playwright
-except ImportError:
-    async_playwright = None
 from bs4 import BeautifulSoup
+import bisect
 import datetime
+import functools
+import hashlib
 import re
 import math
+import operator
 import threading
 import json
 import time
@@ -22,6 +21,15 @@ from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 import csv
 import os
+from collections import OrderedDict
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import ijson
+except ImportError:
+    ijson = None
 
 # ¡Importante! Importa tu nuevo módulo de scraping
 from modules.estudio_scraper import (
@@ -29,7 +37,10 @@ from modules.estudio_scraper import (
     format_ah_as_decimal_string_of,
     parse_ah_to_number_of,
     check_handicap_cover,
-    generar_analisis_completo_mercado
+    generar_analisis_completo_mercado,
+    get_analysis_cached_at,
+    df_to_rows,
+    ANALYSIS_CACHE_TTL_SECONDS
 )
 from flask import jsonify # Asegúrate de que jsonify está importado
 
@@ -39,30 +50,29 @@ app = Flask(__name__)
 STUDIED_MATCHES_DIR = Path(__file__).resolve().parent.parent / 'studied_matches'
 STUDIED_MATCHES_CSV = STUDIED_MATCHES_DIR / 'history.csv'
 
+STUDIED_MATCHES_CSV_FIELDNAMES = (
+    'timestamp', 'match_id', 'home_team', 'away_team',
+    'score', 'time', 'competition', 'ah_line', 'ou_line',
+    'last_home_score', 'last_home_ah',
+    'last_away_score', 'last_away_ah',
+    'comp_home_rival', 'comp_home_score', 'comp_home_ah', 'comp_home_localia',
+    'comp_away_rival', 'comp_away_score', 'comp_away_ah', 'comp_away_localia'
+)
+# Las peticiones y los hilos de fondo escriben en el mismo CSV: una escritura a la vez.
+_studied_matches_csv_lock = threading.Lock()
+
+
+def _get_nested_csv_value(d, *keys):
+    """Valor anidado apto para CSV (texto o número); '' si falta."""
+    for k in keys:
+        if not isinstance(d, dict): return ''
+        d = d.get(k, {})
+    return d if isinstance(d, str) or isinstance(d, (int, float)) else ''
+
+
 def save_match_to_csv(match_data):
     """Guarda los datos básicos del partido en un CSV."""
     try:
-        STUDIED_MATCHES_DIR.mkdir(parents=True, exist_ok=True)
-        
-        file_exists = STUDIED_MATCHES_CSV.exists()
-        
-        # Definir columnas
-        fieldnames = [
-            'timestamp', 'match_id', 'home_team', 'away_team', 
-            'score', 'time', 'competition', 'ah_line', 'ou_line',
-            'last_home_score', 'last_home_ah',
-            'last_away_score', 'last_away_ah',
-            'comp_home_rival', 'comp_home_score', 'comp_home_ah', 'comp_home_localia',
-            'comp_away_rival', 'comp_away_score', 'comp_away_ah', 'comp_away_localia'
-        ]
-        
-        # Helper to safely get nested dict values
-        def get_nested(d, *keys):
-            for k in keys:
-                if not isinstance(d, dict): return ''
-                d = d.get(k, {})
-            return d if isinstance(d, str) or isinstance(d, (int, float)) else ''
-
         row = {
             'timestamp': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
             'match_id': match_data.get('match_id', ''),
@@ -71,33 +81,36 @@ def save_match_to_csv(match_data):
             'score': match_data.get('final_score', ''),
             'time': match_data.get('time', ''),
             'competition': match_data.get('league_name', ''),
-            'ah_line': get_nested(match_data, 'main_match_odds', 'ah_linea'),
-            'ou_line': get_nested(match_data, 'main_match_odds', 'goals_linea'),
+            'ah_line': _get_nested_csv_value(match_data, 'main_match_odds', 'ah_linea'),
+            'ou_line': _get_nested_csv_value(match_data, 'main_match_odds', 'goals_linea'),
             
             # Historial Inmediato
-            'last_home_score': get_nested(match_data, 'last_home_match', 'score'),
-            'last_home_ah': get_nested(match_data, 'last_home_match', 'handicap_line_raw'),
-            'last_away_score': get_nested(match_data, 'last_away_match', 'score'),
-            'last_away_ah': get_nested(match_data, 'last_away_match', 'handicap_line_raw'),
+            'last_home_score': _get_nested_csv_value(match_data, 'last_home_match', 'score'),
+            'last_home_ah': _get_nested_csv_value(match_data, 'last_home_match', 'handicap_line_raw'),
+            'last_away_score': _get_nested_csv_value(match_data, 'last_away_match', 'score'),
+            'last_away_ah': _get_nested_csv_value(match_data, 'last_away_match', 'handicap_line_raw'),
             
             # Comparativas Indirectas (H2H Rivales Col3)
             # Nota: Ahora están dentro de 'comparativas_indirectas' -> 'left' / 'right'
-            'comp_home_rival': get_nested(match_data, 'comparativas_indirectas', 'left', 'rival_name'),
-            'comp_home_score': get_nested(match_data, 'comparativas_indirectas', 'left', 'score'),
-            'comp_home_ah': get_nested(match_data, 'comparativas_indirectas', 'left', 'ah_line'),
-            'comp_home_localia': get_nested(match_data, 'comparativas_indirectas', 'left', 'localia'),
+            'comp_home_rival': _get_nested_csv_value(match_data, 'comparativas_indirectas', 'left', 'rival_name'),
+            'comp_home_score': _get_nested_csv_value(match_data, 'comparativas_indirectas', 'left', 'score'),
+            'comp_home_ah': _get_nested_csv_value(match_data, 'comparativas_indirectas', 'left', 'ah_line'),
+            'comp_home_localia': _get_nested_csv_value(match_data, 'comparativas_indirectas', 'left', 'localia'),
             
-            'comp_away_rival': get_nested(match_data, 'comparativas_indirectas', 'right', 'rival_name'),
-            'comp_away_score': get_nested(match_data, 'comparativas_indirectas', 'right', 'score'),
-            'comp_away_ah': get_nested(match_data, 'comparativas_indirectas', 'right', 'ah_line'),
-            'comp_away_localia': get_nested(match_data, 'comparativas_indirectas', 'right', 'localia'),
+            'comp_away_rival': _get_nested_csv_value(match_data, 'comparativas_indirectas', 'right', 'rival_name'),
+            'comp_away_score': _get_nested_csv_value(match_data, 'comparativas_indirectas', 'right', 'score'),
+            'comp_away_ah': _get_nested_csv_value(match_data, 'comparativas_indirectas', 'right', 'ah_line'),
+            'comp_away_localia': _get_nested_csv_value(match_data, 'comparativas_indirectas', 'right', 'localia'),
         }
 
-        with open(STUDIED_MATCHES_CSV, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            if not file_exists:
-                writer.writeheader()
-            writer.writerow(row)
+        with _studied_matches_csv_lock:
+            STUDIED_MATCHES_DIR.mkdir(parents=True, exist_ok=True)
+            with open(STUDIED_MATCHES_CSV, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=STUDIED_MATCHES_CSV_FIELDNAMES)
+                # Cabecera solo si el archivo está vacío (recién creado).
+                if f.tell() == 0:
+                    writer.writeheader()
+                writer.writerow(row)
             
         print(f"Partido {match_data.get('match_id')} guardado en CSV.")
     except Exception as e:
@@ -134,52 +147,269 @@ else:
 
 _data_file_lock = threading.Lock()
 
+# orjson parsea directamente desde bytes (sin decodificar a str); json estándar como respaldo.
+_loads = orjson.loads if orjson else json.loads
 
-def load_data_from_file():
-    """Carga los datos desde el archivo JSON, similar a la app ligera."""
-    with _data_file_lock:
-        if not DATA_FILE.exists():
-            return {key: [] for key in _EMPTY_DATA_TEMPLATE}
+
+def _dumps(obj):
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+
+# Última versión normalizada de data.json, indexada por (ruta, mtime, tamaño). El stat del
+# archivo se repite como mucho cada DATA_FILE_RECHECK_SECONDS, así que las llamadas de una
+# misma petición (y las seguidas) comparten snapshot sin syscalls.
+DATA_FILE_RECHECK_SECONDS = 2
+_data_cache = {'key': None, 'snapshot': None, 'checked_at': 0.0}
+
+
+def _data_file_signature():
+    try:
+        stat = DATA_FILE.stat()
+    except OSError:
+        return None
+    return (str(DATA_FILE), stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=8192)
+def _parse_time_str(value):
+    # Muchos partidos comparten la misma hora de inicio, así que cada cadena se parsea una sola vez.
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
         try:
-            with DATA_FILE.open('r', encoding='utf-8') as fh:
-                data = json.load(fh)
-        except (json.JSONDecodeError, OSError) as exc:
-            print(f"Error al leer {DATA_FILE}: {exc}")
-            return {key: [] for key in _EMPTY_DATA_TEMPLATE}
-        if not isinstance(data, dict):
-            return {key: [] for key in _EMPTY_DATA_TEMPLATE}
-
-        normalized = {}
-        for key in _EMPTY_DATA_TEMPLATE:
-            value = data.get(key, [])
-            if isinstance(value, list):
-                normalized[key] = [item for item in value if isinstance(item, dict)]
-            else:
-                normalized[key] = []
-        return normalized
+            return datetime.datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            return None
+
+
+def _parse_data_t(value):
+    """
+    Hora 'YYYY-MM-DD HH:MM:SS' del atributo data-t. Con esa forma exacta usa el parser ISO
+    en C; cualquier otra cosa pasa por strptime, que mantiene el mismo ValueError de siempre.
+    """
+    if (len(value) == 19 and value[4] == '-' and value[7] == '-' and value[10] == ' '
+            and value[13] == ':' and value[16] == ':'):
+        try:
+            return datetime.datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    return datetime.datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
 
 
 def _parse_time_obj(value):
     if isinstance(value, datetime.datetime):
         return value
     if isinstance(value, str):
-        try:
-            return datetime.datetime.fromisoformat(value)
-        except ValueError:
-            try:
-                return datetime.datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
-            except ValueError:
-                return None
+        return _parse_time_str(value)
     return None
 
 
+@functools.lru_cache(maxsize=8192)
+def _display_time_str(parsed_time):
+    return parsed_time.strftime('%d/%m %H:%M')
+
+
 def _ensure_time_string(entry, parsed_time):
     if entry.get('time') or not parsed_time:
         return
-    entry['time'] = parsed_time.strftime('%d/%m %H:%M')
+    # Igual que al parsear: una hora de inicio compartida se formatea una sola vez.
+    entry['time'] = _display_time_str(parsed_time)
 
 
-def _build_handicap_filter_predicate(handicap_filter):
+# Claves internas añadidas al normalizar; nunca se devuelven en las respuestas.
+_PRIVATE_MATCH_KEYS = ('_time', '_sort_key', '_handicap_bucket', '_goal_line_value')
+
+
+_SORT_KEY_GETTER = operator.itemgetter('_sort_key')
+
+
+def _is_match_dict(item):
+    return isinstance(item, dict)
+
+
+def _normalize_match(entry, _parse=_parse_time_obj, _ensure=_ensure_time_string):
+    normalized = dict(entry)
+    if normalized.get('id') is not None:
+        normalized['id'] = str(normalized['id'])
+    parsed_time = _parse(normalized.get('time_obj'))
+    normalized['_time'] = parsed_time
+    normalized['_sort_key'] = (parsed_time or datetime.datetime.min, normalized.get('id', ''))
+    # Claves de filtrado precalculadas: cada petición solo compara valores.
+    normalized['_handicap_bucket'] = _handicap_filter_key(normalized.get('handicap', ''))
+    normalized['_goal_line_value'] = _goal_line_filter_key(normalized.get('goal_line', ''))
+    _ensure(normalized, parsed_time)
+    return normalized
+
+
+def _public_match(entry):
+    return {key: value for key, value in entry.items() if key not in _PRIVATE_MATCH_KEYS}
+
+
+# A partir de este tamaño data.json se parsea en streaming (si ijson está disponible): cada
+# sección se recorre partido a partido con ijson.items, así que nunca está entera en crudo en
+# memoria. ijson crea un str nuevo por cada clave de cada partido (orjson las reutiliza); se
+# internan antes de normalizar para que el snapshot no guarde miles de copias de 'home_team'.
+DATA_FILE_STREAM_THRESHOLD_BYTES = 2_000_000
+
+
+def _intern_keys(entry, _intern=sys.intern):
+    return {_intern(key): value for key, value in entry.items()}
+
+
+def _read_data_file_streaming():
+    normalized = {}
+    try:
+        with DATA_FILE.open('rb') as fh:
+            for key in _EMPTY_DATA_TEMPLATE:
+                fh.seek(0)
+                items = ijson.items(fh, f'{key}.item', use_float=True)
+                normalized[key] = [_normalize_match(_intern_keys(entry)) for entry in items if _is_match_dict(entry)]
+    except (ijson.JSONError, OSError) as exc:
+        print(f"Error al leer {DATA_FILE}: {exc}")
+        return None
+    return normalized
+
+
+def _read_data_file():
+    if ijson is not None:
+        try:
+            if DATA_FILE.stat().st_size > DATA_FILE_STREAM_THRESHOLD_BYTES:
+                return _read_data_file_streaming()
+        except OSError:
+            pass
+    try:
+        data = _loads(DATA_FILE.read_bytes())
+    except (json.JSONDecodeError, OSError) as exc:
+        print(f"Error al leer {DATA_FILE}: {exc}")
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    normalized = {}
+    for key in _EMPTY_DATA_TEMPLATE:
+        value = data.get(key, [])
+        if isinstance(value, list):
+            normalized[key] = list(map(_normalize_match, filter(_is_match_dict, value)))
+        else:
+            normalized[key] = []
+    return normalized
+
+
+def _empty_data_snapshot():
+    return {'data': {key: [] for key in _EMPTY_DATA_TEMPLATE}, 'by_id': {}, 'distinct': {}, 'sorted': {}, 'sort_times': {}}
+
+
+def _build_distinct_filter_keys(data):
+    """Valores distintos de bucket de hándicap y de línea de goles por sección."""
+    distinct = {}
+    for section, entries in data.items():
+        distinct[section] = {
+            'handicap': frozenset(entry['_handicap_bucket'] for entry in entries),
+            'goal_line': frozenset(entry['_goal_line_value'] for entry in entries),
+        }
+    return distinct
+
+
+def _build_sorted_views(data):
+    """
+    Cada sección ordenada por (_time, id) en ambos sentidos, una vez por snapshot.
+    Se ordena con sort(reverse=...) en lugar de invertir la ascendente para conservar
+    el mismo orden estable que antes ante claves repetidas.
+    """
+    views = {}
+    for section, entries in data.items():
+        views[(section, False)] = sorted(entries, key=_SORT_KEY_GETTER)
+        views[(section, True)] = sorted(entries, key=_SORT_KEY_GETTER, reverse=True)
+    return views
+
+
+def _build_sort_times(sorted_views):
+    """Horas de ordenación (ascendentes) por sección, para recortar min_time con bisect."""
+    return {
+        section: [entry['_sort_key'][0] for entry in entries]
+        for (section, desc), entries in sorted_views.items()
+        if not desc
+    }
+
+
+def _apply_min_time(view, sort_times, min_time, sort_desc):
+    """
+    Equivale a descartar las entradas con hora anterior a min_time (las que no tienen hora se
+    conservan), pero localizando el corte con bisect sobre la vista ya ordenada.
+    """
+    if not min_time:
+        return view
+    cut = bisect.bisect_left(sort_times, min_time)
+    if sort_desc:
+        recent_count = len(view) - cut
+        return view[:recent_count] + [entry for entry in view[recent_count:] if entry['_time'] is None]
+    return [entry for entry in view[:cut] if entry['_time'] is None] + view[cut:]
+
+
+def _matching_keys(predicate, keys):
+    """Evalúa el predicado una vez por valor distinto; None si no hay filtro."""
+    if predicate is None:
+        return None
+    return frozenset(key for key in keys if predicate(key))
+
+
+def _build_match_index(data):
+    index = {}
+    for section in ('upcoming_matches', 'finished_matches'):
+        for entry in data.get(section, []):
+            match_id = entry.get('id')
+            if match_id is not None:
+                index.setdefault(match_id, (entry, section))
+    return index
+
+
+def _load_data_snapshot():
+    with _data_file_lock:
+        now = time.monotonic()
+        if _data_cache['snapshot'] is not None and (now - _data_cache['checked_at']) < DATA_FILE_RECHECK_SECONDS:
+            return _data_cache['snapshot']
+
+        signature = _data_file_signature()
+        if signature is None:
+            return _empty_data_snapshot()
+        if _data_cache['key'] == signature:
+            _data_cache['checked_at'] = now
+            return _data_cache['snapshot']
+
+        normalized = _read_data_file()
+        if normalized is None:
+            return _empty_data_snapshot()
+        sorted_views = _build_sorted_views(normalized)
+        snapshot = {
+            'data': normalized,
+            'by_id': _build_match_index(normalized),
+            'distinct': _build_distinct_filter_keys(normalized),
+            'sorted': sorted_views,
+            'sort_times': _build_sort_times(sorted_views),
+        }
+        _data_cache['key'] = signature
+        _data_cache['snapshot'] = snapshot
+        _data_cache['checked_at'] = now
+        return snapshot
+
+
+def load_data_from_file():
+    """
+    Carga los datos desde el archivo JSON, similar a la app ligera.
+    Solo se vuelve a leer y normalizar cuando cambia el mtime o el tamaño del archivo;
+    el resultado es compartido entre peticiones y no debe modificarse.
+    """
+    return _load_data_snapshot()['data']
+
+
+def _handicap_filter_key(raw_value):
+    return normalize_handicap_to_half_bucket_str(raw_value or '')
+
+
+def _build_handicap_bucket_predicate(handicap_filter):
+    """Predicado sobre el bucket ya normalizado (ver _handicap_filter_key)."""
     if not handicap_filter:
         return None
     try:
@@ -192,8 +422,7 @@ def _build_handicap_filter_predicate(handicap_filter):
 
     use_range = abs(target_float) >= 2.0 and target_float != 0.0
 
-    def predicate(raw_value):
-        hv = normalize_handicap_to_half_bucket_str(raw_value or '')
+    def predicate(hv):
         if hv is None:
             return False
         if not use_range:
@@ -206,6 +435,17 @@ def _build_handicap_filter_predicate(handicap_filter):
     return predicate
 
 
+def _build_handicap_filter_predicate(handicap_filter):
+    bucket_predicate = _build_handicap_bucket_predicate(handicap_filter)
+    if bucket_predicate is None:
+        return None
+
+    def predicate(raw_value):
+        return bucket_predicate(_handicap_filter_key(raw_value))
+
+    return predicate
+
+
 def _normalize_goal_line_option_str(value):
     try:
         parsed = _parse_handicap_to_float(value)
@@ -219,7 +459,15 @@ def _normalize_goal_line_option_str(value):
     return text
 
 
-def _build_goal_line_filter_predicate(goal_line_filter):
+def _goal_line_filter_key(raw_value):
+    try:
+        return _parse_handicap_to_float(raw_value or '')
+    except Exception:
+        return None
+
+
+def _build_goal_line_value_predicate(goal_line_filter):
+    """Predicado sobre el valor numérico ya parseado (ver _goal_line_filter_key)."""
     if not goal_line_filter:
         return None
     try:
@@ -230,11 +478,7 @@ def _build_goal_line_filter_predicate(goal_line_filter):
         return None
     use_range = target_value >= 4.0
 
-    def predicate(raw_value):
-        try:
-            current_value = _parse_handicap_to_float(raw_value or '')
-        except Exception:
-            current_value = None
+    def predicate(current_value):
         if current_value is None:
             return False
         if not use_range:
@@ -244,6 +488,17 @@ def _build_goal_line_filter_predicate(goal_line_filter):
     return predicate
 
 
+def _build_goal_line_filter_predicate(goal_line_filter):
+    value_predicate = _build_goal_line_value_predicate(goal_line_filter)
+    if value_predicate is None:
+        return None
+
+    def predicate(raw_value):
+        return value_predicate(_goal_line_filter_key(raw_value))
+
+    return predicate
+
+
 def _build_handicap_options_from_lists(match_lists):
     values = set()
     for dataset in match_lists:
@@ -275,38 +530,59 @@ def _build_goal_line_options_from_lists(match_lists):
         return sorted(values)
 
 
-def _filter_and_slice_matches(section, limit=None, offset=0, handicap_filter=None, goal_line_filter=None, sort_desc=False, min_time=None):
-    data = load_data_from_file()
-    matches = data.get(section, [])
-    prepared = []
-    for original in matches:
-        entry = dict(original)
-        parsed_time = _parse_time_obj(entry.get('time_obj'))
-        entry['_sort_time'] = parsed_time or datetime.datetime.min
-        _ensure_time_string(entry, parsed_time)
-        
-        if min_time and parsed_time and parsed_time < min_time:
-            continue
-            
-        prepared.append(entry)
+FILTER_OPTIONS_CACHE_MAX_ENTRIES = 64
+_filter_options_lock = threading.Lock()
 
-    handicap_predicate = _build_handicap_filter_predicate(handicap_filter)
-    if handicap_predicate:
-        filtered = []
-        for entry in prepared:
-            if handicap_predicate(entry.get('handicap', '')):
-                filtered.append(entry)
-        prepared = filtered
 
-    goal_predicate = _build_goal_line_filter_predicate(goal_line_filter)
-    if goal_predicate:
-        filtered = []
-        for entry in prepared:
-            if goal_predicate(entry.get('goal_line', '')):
-                filtered.append(entry)
-        prepared = filtered
+def _get_dashboard_filter_options(snapshot, handicap_filter, goal_line_filter, upcoming_matches, finished_matches):
+    """
+    Opciones de los desplegables para unos filtros dados. Se guardan en el propio snapshot,
+    así que se descartan solas cuando cambia data.json.
+    """
+    cache_key = (handicap_filter, goal_line_filter)
+    with _filter_options_lock:
+        cached = snapshot.setdefault('filter_options', {}).get(cache_key)
+    if cached is not None:
+        return cached
+
+    match_lists = [upcoming_matches, finished_matches]
+    options = (
+        _build_handicap_options_from_lists(match_lists),
+        _build_goal_line_options_from_lists(match_lists),
+    )
+    with _filter_options_lock:
+        cache = snapshot['filter_options']
+        if len(cache) >= FILTER_OPTIONS_CACHE_MAX_ENTRIES:
+            cache.clear()
+        cache[cache_key] = options
+    return options
 
-    prepared.sort(key=lambda item: (item['_sort_time'], item.get('id', '')), reverse=sort_desc)
+
+def _filter_and_slice_matches(section, limit=None, offset=0, handicap_filter=None, goal_line_filter=None, sort_desc=False, min_time=None):
+    snapshot = _load_data_snapshot()
+    # Las vistas ya vienen ordenadas y filtrar conserva el orden: no hay sort por petición.
+    matches = snapshot['sorted'].get((section, bool(sort_desc)), [])
+    distinct = snapshot['distinct'].get(section, {})
+    # Los predicados se resuelven contra los valores distintos del snapshot; por fila
+    # solo queda una búsqueda en un conjunto.
+    allowed_buckets = _matching_keys(
+        _build_handicap_bucket_predicate(handicap_filter), distinct.get('handicap', ()))
+    allowed_goal_lines = _matching_keys(
+        _build_goal_line_value_predicate(goal_line_filter), distinct.get('goal_line', ()))
+
+    matches = _apply_min_time(matches, snapshot['sort_times'].get(section, []), min_time, sort_desc)
+
+    if allowed_buckets is None and allowed_goal_lines is None:
+        # Sin filtros de línea no hace falta recorrer las filas.
+        prepared = matches
+    else:
+        prepared = []
+        for entry in matches:
+            if allowed_buckets is not None and entry['_handicap_bucket'] not in allowed_buckets:
+                continue
+            if allowed_goal_lines is not None and entry['_goal_line_value'] not in allowed_goal_lines:
+                continue
+            prepared.append(entry)
 
     offset = max(int(offset or 0), 0)
     if offset:
@@ -323,20 +599,13 @@ def _filter_and_slice_matches(section, limit=None, offset=0, handicap_filter=Non
         if limit_val is not None and limit_val >= 0:
             prepared = prepared[:limit_val]
 
-    for entry in prepared:
-        entry.pop('_sort_time', None)
-    return prepared
+    return [_public_match(entry) for entry in prepared]
 
 
 def _find_match_basic_data(match_id: str):
     if not match_id:
         return None, None
-    data = load_data_from_file()
-    for section in ('upcoming_matches', 'finished_matches'):
-        for entry in data.get(section, []):
-            if str(entry.get('id')) == str(match_id):
-                return entry, section
-    return None, None
+    return _load_data_snapshot()['by_id'].get(str(match_id), (None, None))
 
 
 def _get_preview_cache_dir():
@@ -347,18 +616,81 @@ def _get_preview_cache_dir():
     return static_root / 'cached_previews'
 
 
-def load_preview_from_cache(match_id: str):
-    cache_dir = _get_preview_cache_dir()
-    cache_path = cache_dir / f'{match_id}.json'
-    if cache_path.exists():
+# Previews ya parseadas: match_id -> (mtime_ns, payload). Se descartan al cambiar el archivo.
+PREVIEW_MEMO_MAX_ENTRIES = 512
+_preview_memo = {}
+_preview_memo_lock = threading.Lock()
+
+# Índice match_id -> ruta del JSON cacheado, construido con un único scandir del directorio.
+# Se reconstruye si cambia el mtime del directorio (archivos escritos por otro proceso o
+# worker), comprobándolo como mucho una vez cada PREVIEW_INDEX_RECHECK_SECONDS.
+PREVIEW_INDEX_RECHECK_SECONDS = 5
+_preview_index_state = {'index': None, 'dir_mtime_ns': None, 'checked_at': 0.0}
+_preview_index_lock = threading.Lock()
+
+
+def _scan_preview_dir(cache_dir):
+    index = {}
+    try:
+        with os.scandir(cache_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith('.json') and entry.is_file():
+                    index[entry.name[:-5]] = Path(entry.path)
+    except OSError:
+        pass
+    return index
+
+
+def _get_preview_index():
+    with _preview_index_lock:
+        state = _preview_index_state
+        now = time.monotonic()
+        if state['index'] is not None and (now - state['checked_at']) < PREVIEW_INDEX_RECHECK_SECONDS:
+            return state['index']
+
+        cache_dir = _get_preview_cache_dir()
         try:
-            with cache_path.open('r', encoding='utf-8') as fh:
-                cached_data = json.load(fh)
-                if isinstance(cached_data, dict):
-                    return cached_data
-        except (json.JSONDecodeError, OSError) as exc:
-            print(f"Error al leer cache de analisis {cache_path}: {exc}")
-    return None
+            dir_mtime = cache_dir.stat().st_mtime_ns
+        except OSError:
+            dir_mtime = None
+        state['checked_at'] = now
+        if state['index'] is None or dir_mtime != state['dir_mtime_ns']:
+            state['index'] = _scan_preview_dir(cache_dir)
+            state['dir_mtime_ns'] = dir_mtime
+        return state['index']
+
+
+def load_preview_from_cache(match_id: str):
+    cache_path = _get_preview_index().get(match_id)
+    if cache_path is None:
+        return None
+    try:
+        mtime = cache_path.stat().st_mtime_ns
+    except OSError:
+        with _preview_index_lock:
+            if _preview_index_state['index'] is not None:
+                _preview_index_state['index'].pop(match_id, None)
+        return None
+
+    with _preview_memo_lock:
+        memo = _preview_memo.get(match_id)
+    if memo and memo[0] == mtime:
+        return memo[1]
+
+    try:
+        cached_data = _loads(cache_path.read_bytes())
+    except (json.JSONDecodeError, OSError) as exc:
+        print(f"Error al leer cache de analisis {cache_path}: {exc}")
+        return None
+    if not isinstance(cached_data, dict):
+        return None
+
+    with _preview_memo_lock:
+        _preview_memo.pop(match_id, None)
+        _preview_memo[match_id] = (mtime, cached_data)
+        if len(_preview_memo) > PREVIEW_MEMO_MAX_ENTRIES:
+            _preview_memo.pop(next(iter(_preview_memo)))
+    return cached_data
 
 
 def save_preview_to_cache(match_id: str, payload: dict):
@@ -366,10 +698,13 @@ def save_preview_to_cache(match_id: str, payload: dict):
     try:
         cache_dir.mkdir(parents=True, exist_ok=True)
         cache_path = cache_dir / f'{match_id}.json'
-        with cache_path.open('w', encoding='utf-8') as fh:
-            json.dump(payload, fh, ensure_ascii=False)
+        cache_path.write_bytes(_dumps(payload))
     except OSError as exc:
         print(f"Error al escribir cache de analisis para {match_id}: {exc}")
+        return
+    index = _get_preview_index()
+    with _preview_index_lock:
+        index[match_id] = cache_path
 
 
 def _build_nowgoal_url(path: str | None = None) -> str:
@@ -420,6 +755,10 @@ async def _fetch_nowgoal_html(path: str | None = None, filter_state: int | None
     
     return None
 
+# Patrones compilados una vez; se usan en cada línea de hándicap/goles parseada.
+_NUMBER_RE = re.compile(r"^[+-]?\d+(?:\.\d+)?$")
+_SCORE_RE = re.compile(r'^\d+\s*-\s*\d+$')
+
 def _parse_number_clean(s):
     if s is None:
         return None
@@ -428,7 +767,7 @@ def _parse_number_clean(s):
     txt = txt.replace(',', '.')
     txt = txt.replace('+', '')
     txt = txt.replace(' ', '')
-    m = re.search(r"^[+-]?\d+(?:\.\d+)?$", txt)
+    m = _NUMBER_RE.search(txt)
     if m:
         try:
             return float(m.group(0))
@@ -445,7 +784,7 @@ def _parse_number(s: str):
     txt = txt.replace(',', '.')
     txt = txt.replace(' ', '')
     # Coincide con un número decimal con signo
-    m = re.search(r"^[+-]?\d+(?:\.\d+)?$", txt)
+    m = _NUMBER_RE.search(txt)
     if m:
         try:
             return float(m.group(0))
@@ -454,11 +793,21 @@ def _parse_number(s: str):
     return None
 
 def _parse_handicap_to_float(text: str):
+    if isinstance(text, str):
+        return _parse_handicap_str_to_float(text)
+    return _parse_handicap_to_float_uncached(text)
+
+# Las mismas pocas líneas ("0.5", "2.5/3", ...) se repiten en miles de partidos.
+@functools.lru_cache(maxsize=4096)
+def _parse_handicap_str_to_float(text):
+    return _parse_handicap_to_float_uncached(text)
+
+def _parse_handicap_to_float_uncached(text):
     if text is None:
         return None
     t = str(text).strip()
     if '/' in t:
-        parts = [p for p in re.split(r"/", t) if p]
+        parts = [p for p in t.split('/') if p]
         nums = []
         for p in parts:
             v = _parse_number_clean(p)
@@ -497,6 +846,15 @@ def _bucket_to_half(value: float) -> float:
     return sign * bucket
 
 def normalize_handicap_to_half_bucket_str(text: str):
+    if isinstance(text, str):
+        return _normalize_handicap_str_to_half_bucket(text)
+    return _normalize_handicap_to_half_bucket_uncached(text)
+
+@functools.lru_cache(maxsize=4096)
+def _normalize_handicap_str_to_half_bucket(text):
+    return _normalize_handicap_to_half_bucket_uncached(text)
+
+def _normalize_handicap_to_half_bucket_uncached(text):
     v = _parse_handicap_to_float(text)
     if v is None:
         return None
@@ -520,7 +878,7 @@ def parse_main_page_matches(html_content, limit=20, offset=0, handicap_filter=No
         if not time_cell or not time_cell.has_attr('data-t'): continue
         
         try:
-            match_time = datetime.datetime.strptime(time_cell['data-t'], '%Y-%m-%d %H:%M:%S')
+            match_time = _parse_data_t(time_cell['data-t'])
         except (ValueError, IndexError):
             continue
 
@@ -546,20 +904,13 @@ def parse_main_page_matches(html_content, limit=20, offset=0, handicap_filter=No
         })
 
     handicap_predicate = _build_handicap_filter_predicate(handicap_filter)
-    if handicap_predicate:
-        filtered = []
-        for m in upcoming_matches:
-            if handicap_predicate(m.get('handicap', '')):
-                filtered.append(m)
-        upcoming_matches = filtered
-
     goal_predicate = _build_goal_line_filter_predicate(goal_line_filter)
-    if goal_predicate:
-        filtered = []
-        for m in upcoming_matches:
-            if goal_predicate(m.get('goal_line', '')):
-                filtered.append(m)
-        upcoming_matches = filtered
+    if handicap_predicate or goal_predicate:
+        upcoming_matches = [
+            m for m in upcoming_matches
+            if (not handicap_predicate or handicap_predicate(m.get('handicap', '')))
+            and (not goal_predicate or goal_predicate(m.get('goal_line', '')))
+        ]
 
     upcoming_matches.sort(key=lambda x: x['time_obj'])
     
@@ -598,7 +949,7 @@ def parse_main_page_finished_matches(html_content, limit=20, offset=0, handicap_
             else:
                 score_text = score_cell.get_text(strip=True)
 
-        if not re.match(r'^\d+\s*-\s*\d+$', score_text):
+        if not _SCORE_RE.match(score_text):
             continue
 
         odds_data = row.get('odds', '').split(',')
@@ -612,7 +963,7 @@ def parse_main_page_finished_matches(html_content, limit=20, offset=0, handicap_
         match_time = datetime.datetime.now()
         if time_cell and time_cell.has_attr('data-t'):
             try:
-                match_time = datetime.datetime.strptime(time_cell['data-t'], '%Y-%m-%d %H:%M:%S')
+                match_time = _parse_data_t(time_cell['data-t'])
             except (ValueError, IndexError):
                 continue
         
@@ -627,20 +978,13 @@ def parse_main_page_finished_matches(html_content, limit=20, offset=0, handicap_
         })
 
     handicap_predicate = _build_handicap_filter_predicate(handicap_filter)
-    if handicap_predicate:
-        filtered = []
-        for m in finished_matches:
-            if handicap_predicate(m.get('handicap', '')):
-                filtered.append(m)
-        finished_matches = filtered
-
     goal_predicate = _build_goal_line_filter_predicate(goal_line_filter)
-    if goal_predicate:
-        filtered = []
-        for m in finished_matches:
-            if goal_predicate(m.get('goal_line', '')):
-                filtered.append(m)
-        finished_matches = filtered
+    if handicap_predicate or goal_predicate:
+        finished_matches = [
+            m for m in finished_matches
+            if (not handicap_predicate or handicap_predicate(m.get('handicap', '')))
+            and (not goal_predicate or goal_predicate(m.get('goal_line', '')))
+        ]
 
     finished_matches.sort(key=lambda x: x['time_obj'], reverse=True)
     
@@ -652,7 +996,7 @@ def parse_main_page_finished_matches(html_content, limit=20, offset=0, handicap_
 
     return paginated_matches
 
-async def get_main_page_matches_async(limit=None, offset=0, handicap_filter=None, goal_line_filter=None):
+def get_main_page_matches(limit=None, offset=0, handicap_filter=None, goal_line_filter=None):
     return _filter_and_slice_matches(
         'upcoming_matches',
         limit=limit,
@@ -663,7 +1007,7 @@ async def get_main_page_matches_async(limit=None, offset=0, handicap_filter=None
     )
 
 
-async def get_main_page_finished_matches_async(limit=None, offset=0, handicap_filter=None, goal_line_filter=None):
+def get_main_page_finished_matches(limit=None, offset=0, handicap_filter=None, goal_line_filter=None):
     return _filter_and_slice_matches(
         'finished_matches',
         limit=limit,
@@ -674,28 +1018,24 @@ async def get_main_page_finished_matches_async(limit=None, offset=0, handicap_fi
     )
 
 
-async def _fetch_sidebar_lists(handicap_filter=None, goal_line_filter=None):
-    return await asyncio.gather(
-        get_main_page_matches_async(handicap_filter=handicap_filter, goal_line_filter=goal_line_filter),
-        get_main_page_finished_matches_async(handicap_filter=handicap_filter, goal_line_filter=goal_line_filter),
-    )
-
-
 def _render_matches_dashboard(page_mode='upcoming', page_title='Partidos'):
     handicap_filter = request.args.get('handicap')
     goal_line_filter = request.args.get('ou')
     error_msg = None
+    snapshot = _load_data_snapshot()
     try:
-        upcoming_matches, finished_matches = asyncio.run(
-            _fetch_sidebar_lists(handicap_filter, goal_line_filter)
-        )
+        upcoming_matches = get_main_page_matches(handicap_filter=handicap_filter, goal_line_filter=goal_line_filter)
+        finished_matches = get_main_page_finished_matches(handicap_filter=handicap_filter, goal_line_filter=goal_line_filter)
     except Exception as exc:
         print(f"ERROR al cargar datos para el dashboard: {exc}")
         upcoming_matches, finished_matches = [], []
         error_msg = f"No se pudieron cargar los partidos: {exc}"
 
-    handicap_options = _build_handicap_options_from_lists([upcoming_matches, finished_matches])
-    goal_line_options = _build_goal_line_options_from_lists([upcoming_matches, finished_matches])
+    if error_msg:
+        handicap_options, goal_line_options = [], []
+    else:
+        handicap_options, goal_line_options = _get_dashboard_filter_options(
+            snapshot, handicap_filter, goal_line_filter, upcoming_matches, finished_matches)
     active_matches = finished_matches if page_mode == 'finished' else upcoming_matches
 
     return render_template(
@@ -740,7 +1080,7 @@ def api_matches():
         offset = int(request.args.get('offset', 0))
         limit = int(request.args.get('limit', 5))
         limit = min(limit, 50)
-        matches = asyncio.run(get_main_page_matches_async(limit, offset, request.args.get('handicap'), request.args.get('ou')))
+        matches = get_main_page_matches(limit, offset, request.args.get('handicap'), request.args.get('ou'))
         return jsonify({'matches': matches})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -751,7 +1091,7 @@ def api_finished_matches():
         offset = int(request.args.get('offset', 0))
         limit = int(request.args.get('limit', 5))
         limit = min(limit, 50)
-        matches = asyncio.run(get_main_page_finished_matches_async(limit, offset, request.args.get('handicap'), request.args.get('ou')))
+        matches = get_main_page_finished_matches(limit, offset, request.args.get('handicap'), request.args.get('ou'))
         return jsonify({'matches': matches})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -761,7 +1101,7 @@ def api_all_finished_matches():
     """Devuelve todos los partidos finalizados disponibles (o un límite alto)."""
     try:
         # Reutilizamos la lógica existente pero con un límite alto
-        matches = asyncio.run(get_main_page_finished_matches_async(limit=1000, offset=0))
+        matches = get_main_page_finished_matches(limit=1000, offset=0)
         return jsonify({'matches': matches})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -772,7 +1112,7 @@ def process_all_finished_matches_background():
     try:
         # 1. Obtener todos los partidos finalizados
         # Usamos un límite alto para traer todos
-        matches = asyncio.run(get_main_page_finished_matches_async(limit=2000, offset=0))
+        matches = get_main_page_finished_matches(limit=2000, offset=0)
         print(f"Se encontraron {len(matches)} partidos finalizados para procesar.")
         
         count = 0
@@ -976,6 +1316,79 @@ def mostrar_estudio(match_id):
     )
 
 
+# Paneles ya renderizados: match_id -> (analyzed_at, digest, html, match, datos). El TTL cuenta
+# desde que se hizo el análisis (no desde el render), así que un panel nunca sobrevive al
+# análisis del que salió. Se limitan a los más recientes.
+PANEL_HTML_CACHE_MAX_ENTRIES = 32
+_panel_html_cache = OrderedDict()
+_panel_html_cache_lock = threading.Lock()
+
+
+def _analysis_digest(datos_partido):
+    """Huella del contenido del análisis; None si no es serializable."""
+    try:
+        return hashlib.blake2b(_dumps(datos_partido), digest_size=16).digest()
+    except (TypeError, ValueError):
+        return None
+
+
+def _build_panel_html(match_id, datos_partido):
+    """Renderiza el panel y su resumen de partido. No toca la caché."""
+    html = render_template(
+        'partials/analysis_panel.html',
+        data=datos_partido,
+        format_ah=format_ah_as_decimal_string_of
+    )
+    match = {
+        'id': match_id,
+        'home': datos_partido.get('home_name'),
+        'away': datos_partido.get('away_name'),
+        'score': datos_partido.get('score'),
+        'time': datos_partido.get('time')
+    }
+    return html, match
+
+
+def _get_cached_panel(match_id, digest=None):
+    """
+    (html, match, datos) vigente para match_id; si se pasa digest, solo si el análisis no cambió.
+    """
+    with _panel_html_cache_lock:
+        entry = _panel_html_cache.get(match_id)
+        if not entry:
+            return None
+        if (time.time() - entry[0]) > ANALYSIS_CACHE_TTL_SECONDS:
+            _panel_html_cache.pop(match_id, None)
+            return None
+        if digest is not None and entry[1] != digest:
+            return None
+        _panel_html_cache.move_to_end(match_id)
+        return entry[2], entry[3], entry[4]
+
+
+def _set_cached_panel(match_id, analyzed_at, digest, html, match, datos_partido):
+    with _panel_html_cache_lock:
+        _panel_html_cache[match_id] = (analyzed_at, digest, html, match, datos_partido)
+        _panel_html_cache.move_to_end(match_id)
+        while len(_panel_html_cache) > PANEL_HTML_CACHE_MAX_ENTRIES:
+            _panel_html_cache.popitem(last=False)
+
+
+def _render_panel_cached(match_id, datos_partido):
+    """Reutiliza el HTML si el análisis (por contenido) es el mismo que ya se pintó."""
+    analyzed_at = get_analysis_cached_at(match_id)
+    if analyzed_at is None:
+        analyzed_at = time.time()
+    digest = _analysis_digest(datos_partido)
+    cached_panel = _get_cached_panel(match_id, digest) if digest is not None else None
+    if cached_panel:
+        html, match = cached_panel[0], cached_panel[1]
+    else:
+        html, match = _build_panel_html(match_id, datos_partido)
+    _set_cached_panel(match_id, analyzed_at, digest, html, match, datos_partido)
+    return html, match
+
+
 @app.route('/api/estudio_panel/<string:match_id>')
 def api_estudio_panel(match_id):
     """
@@ -984,6 +1397,15 @@ def api_estudio_panel(match_id):
     start_time = time.time()
     force_refresh = request.args.get('refresh', 'false').lower() == 'true'
     try:
+        if not force_refresh:
+            cached_panel = _get_cached_panel(match_id)
+            if cached_panel:
+                html, match, datos_partido = cached_panel
+                # El CSV registra cada consulta del panel, también cuando sale de caché.
+                save_match_to_csv(datos_partido)
+                elapsed = round(time.time() - start_time, 2)
+                return jsonify({'html': html, 'match': match, 'meta': {'elapsed': elapsed, 'cached': True}})
+
         datos_partido = analizar_partido_completo(match_id, force_refresh=force_refresh)
         if not datos_partido or "error" in datos_partido:
             error_message = (datos_partido or {}).get('error', 'No se pudo analizar el partido.')
@@ -996,21 +1418,11 @@ def api_estudio_panel(match_id):
         save_match_to_csv(datos_partido)
         # ----------------------
 
-        html = render_template(
-            'partials/analysis_panel.html',
-            data=datos_partido,
-            format_ah=format_ah_as_decimal_string_of
-        )
+        html, match = _render_panel_cached(match_id, datos_partido)
         elapsed = round(time.time() - start_time, 2)
         payload = {
             'html': html,
-            'match': {
-                'id': match_id,
-                'home': datos_partido.get('home_name'),
-                'away': datos_partido.get('away_name'),
-                'score': datos_partido.get('score'),
-                'time': datos_partido.get('time')
-            },
+            'match': match,
             'meta': {'elapsed': elapsed}
         }
         return jsonify(payload)
@@ -1076,26 +1488,6 @@ def api_analisis(match_id):
             return jsonify({'error': (datos or {}).get('error', 'No se pudieron obtener datos.')}), 500
 
         # --- Lógica para el payload complejo (la original) ---
-        def df_to_rows(df):
-            rows = []
-            try:
-                if df is not None and hasattr(df, 'iterrows'):
-                    for idx, row in df.iterrows():
-                        label = str(idx)
-                        label = label.replace('Shots on Goal', 'Tiros a Puerta')                                     .replace('Shots', 'Tiros')                                     .replace('Dangerous Attacks', 'Ataques Peligrosos')                                     .replace('Attacks', 'Ataques')
-                        try:
-                            home_val = row['Casa']
-                        except Exception:
-                            home_val = ''
-                        try:
-                            away_val = row['Fuera']
-                        except Exception:
-                            away_val = ''
-                        rows.append({'label': label, 'home': home_val or '', 'away': away_val or ''})
-            except Exception:
-                pass
-            return rows
-
         payload = {
             'match_id': match_id,
             'home_team': datos.get('home_name', ''),
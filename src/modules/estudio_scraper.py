@@ -2,16 +2,24 @@
 
 import time
 import copy
+import functools
 import requests
 import re
 import json
 import math
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from bs4 import BeautifulSoup
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 import pandas as pd
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_loads = orjson.loads if orjson else json.loads
 # Selenium imports removed
 SELENIUM_AVAILABLE = False
 
@@ -31,6 +39,7 @@ REQUEST_HEADERS = {
 SOUP_CACHE_TTL_SECONDS = 45
 STATS_CACHE_TTL_SECONDS = 300
 ANALYSIS_CACHE_TTL_SECONDS = 120
+STATS_FETCH_MAX_WORKERS = 4
 
 _requests_session = None
 _requests_session_lock = threading.Lock()
@@ -69,6 +78,14 @@ def _get_cached_analysis(match_id: str):
 def _set_cached_analysis(match_id: str, payload: dict):
     _write_cache(_analysis_cache, match_id, copy.deepcopy(payload), _analysis_cache_lock)
 
+
+def get_analysis_cached_at(match_id: str):
+    """Momento (time.time()) en que se cacheó el análisis vigente de match_id, o None."""
+    main_match_id = "".join(filter(str.isdigit, str(match_id)))
+    with _analysis_cache_lock:
+        entry = _analysis_cache.get(main_match_id)
+    return entry[0] if entry else None
+
 # --- FUNCIONES HELPER PARA PARSEO Y FORMATEO ---
 def parse_ah_to_number_of(ah_line_str: str):
     if not isinstance(ah_line_str, str): return None
@@ -95,8 +112,15 @@ def parse_ah_to_number_of(ah_line_str: str):
         return None
 
 def format_ah_as_decimal_string_of(ah_line_str: str, for_sheets=False):
-    if not isinstance(ah_line_str, str) or not ah_line_str.strip() or ah_line_str.strip() in ['-', '?']:
-        return ah_line_str.strip() if isinstance(ah_line_str, str) and ah_line_str.strip() in ['-','?'] else '-'
+    if not isinstance(ah_line_str, str):
+        return '-'
+    return _format_ah_as_decimal_string_cached(ah_line_str, for_sheets)
+
+# Las líneas AH se repiten constantemente (plantillas, búsqueda de clones), así que se memoiza por cadena.
+@functools.lru_cache(maxsize=4096)
+def _format_ah_as_decimal_string_cached(ah_line_str: str, for_sheets=False):
+    if not ah_line_str.strip() or ah_line_str.strip() in ['-', '?']:
+        return ah_line_str.strip() if ah_line_str.strip() in ['-','?'] else '-'
     numeric_value = parse_ah_to_number_of(ah_line_str)
     if numeric_value is None:
         return ah_line_str.strip() if ah_line_str.strip() in ['-','?'] else '-'
@@ -123,18 +147,21 @@ def format_ah_as_decimal_string_of(ah_line_str: str, for_sheets=False):
         return "'" + output_str.replace('.', ',') if output_str not in ['-','?'] else output_str
     return output_str
 
-def _df_to_rows(df):
-    rows = []
+def _translate_stat_label(label):
+    return str(label).replace('Shots on Goal', 'Tiros a Puerta').replace('Shots', 'Tiros').replace('Dangerous Attacks', 'Ataques Peligrosos').replace('Attacks', 'Ataques')
+
+def df_to_rows(df):
+    """Filas label/home/away (etiquetas en español) de un DataFrame de estadísticas."""
     if df is None or df.empty:
-        return rows
-    for idx, row in df.iterrows():
-        label = str(idx).replace('Shots on Goal', 'Tiros a Puerta').replace('Shots', 'Tiros').replace('Dangerous Attacks', 'Ataques Peligrosos').replace('Attacks', 'Ataques')
-        rows.append({
-            'label': label,
-            'home': row.get('Casa', ''),
-            'away': row.get('Fuera', '')
-        })
-    return rows
+        return []
+    # Por columnas en vez de iterrows (que construye una Series por fila).
+    empty_column = [''] * len(df)
+    home_values = df['Casa'].tolist() if 'Casa' in df.columns else empty_column
+    away_values = df['Fuera'].tolist() if 'Fuera' in df.columns else empty_column
+    return [
+        {'label': _translate_stat_label(idx), 'home': home, 'away': away}
+        for idx, home, away in zip(df.index, home_values, away_values)
+    ]
 
 # --- SISTEMA DE ANÁLISIS DE MERCADO ---
 def check_handicap_cover(resultado_raw: str, ah_line_num: float, favorite_team_name: str, home_team_in_h2h: str, away_team_in_h2h: str, main_home_team_name: str):
@@ -179,6 +206,12 @@ def check_goal_line_cover(resultado_raw: str, goal_line_num: float):
     except (ValueError, TypeError):
         return ("indeterminado", None)
 
+# Etiqueta fija por resultado del hándicap; PUSH/indeterminado se pinta con su texto.
+_HANDICAP_COVER_HTML = {
+    True: "<span style='color: green; font-weight: bold;'>CUBIERTO ✅</span>",
+    False: "<span style='color: red; font-weight: bold;'>NO CUBIERTO ❌</span>",
+}
+
 def _analizar_precedente_handicap(precedente_data, ah_actual_num, favorito_actual_name, main_home_team_name):
     res_raw = precedente_data.get('res_raw')
     ah_raw = precedente_data.get('ah_raw')
@@ -221,12 +254,7 @@ def _analizar_precedente_handicap(precedente_data, ah_actual_num, favorito_actua
 
     resultado_cover, cubierto = check_handicap_cover(res_raw, ah_actual_num, favorito_actual_name, home_team_precedente, away_team_precedente, main_home_team_name)
     
-    if cubierto is True:
-        cover_html = f"<span style='color: green; font-weight: bold;'>CUBIERTO ✅</span>"
-    elif cubierto is False:
-        cover_html = f"<span style='color: red; font-weight: bold;'>NO CUBIERTO ❌</span>"
-    else:
-        cover_html = f"<span style='color: #6c757d; font-weight: bold;'>{resultado_cover.upper()} 🤔</span>"
+    cover_html = _HANDICAP_COVER_HTML.get(cubierto) or f"<span style='color: #6c757d; font-weight: bold;'>{resultado_cover.upper()} 🤔</span>"
 
     return f"<li><span class='ah-value'>Hándicap:</span> {comparativa_texto}Con el resultado ({res_raw.replace('-' , ':')}), la línea actual se habría considerado {cover_html}.</li>"
 
@@ -314,85 +342,9 @@ def generar_analisis_completo_mercado(main_odds, h2h_data, home_name, away_name)
     </div>
     """
 
-def _build_historical_matches_list_html(home_matches, away_matches, home_team_name, away_team_name):
-    if not home_matches and not away_matches:
-        return ""
-
-    html = "<div class='historical-matches-container'><div class='row'>"
-
-    def build_table(matches, title, team_name, is_home_context):
-        if not matches: return ""
-        
-        table_html = f"""
-        <div class="col-lg-6">
-            <div class="card mb-3">
-                <div class="card-header bg-light">
-                    <h6 class="mb-0"><strong>{title}</strong> <small class="text-muted">({team_name})</small></h6>
-                </div>
-                <div class="table-responsive">
-                    <table class="table table-sm table-hover mb-0" style="font-size: 0.85rem;">
-                        <thead class="table-light">
-                            <tr>
-                                <th>Liga</th>
-                                <th>Fecha</th>
-                                <th class="text-end">Local</th>
-                                <th class="text-center">Res</th>
-                                <th>Visitante</th>
-                                <th class="text-center">AH</th>
-                                <th class="text-center">O/U</th>
-                            </tr>
-                        </thead>
-                        <tbody>
-        """
-        
-        for m in matches:
-            date = m.get('date', '-')
-            league = m.get('league_id_hist', '-')
-            home = m.get('home', '-')
-            away = m.get('away', '-')
-            score = m.get('score', '-')
-            ah = m.get('ahLine', '-')
-            ou = m.get('ouLine', '-')
-            
-            # Highlight logic
-            home_class = "fw-bold text-primary" if team_name.lower() in home.lower() else ""
-            away_class = "fw-bold text-primary" if team_name.lower() in away.lower() else ""
-            
-            # Score coloring (simple win/loss logic if possible, otherwise just bold)
-            score_style = "font-weight:bold;"
-            
-            table_html += f"""
-                        <tr>
-                            <td>{league}</td>
-                            <td>{date}</td>
-                            <td class="text-end {home_class}">{home}</td>
-                            <td class="text-center" style="{score_style}">{score}</td>
-                            <td class="{away_class}">{away}</td>
-                            <td class="text-center"><span class="badge bg-light text-dark border">{ah}</span></td>
-                            <td class="text-center"><span class="badge bg-light text-dark border">{ou}</span></td>
-                        </tr>
-            """
-        
-        table_html += """
-                        </tbody>
-                    </table>
-                </div>
-            </div>
-        </div>
-        """
-        return table_html
-
-    if home_matches:
-        html += build_table(home_matches, "Partidos en Casa", home_team_name, True)
-    
-    if away_matches:
-        html += build_table(away_matches, "Partidos Fuera", away_team_name, False)
-
-    html += "</div></div>"
-    return html
-
 def _calculate_stats_for_matches(matches, team_name):
     stats = {'W': 0, 'D': 0, 'L': 0, 'O': 0, 'U': 0, 'Push': 0, 'HasOU': False}
+    team_name_lower = team_name.lower()
     for m in matches:
         score_raw = m.get('score_raw', '')
         if not score_raw or '-' not in score_raw: continue
@@ -403,7 +355,7 @@ def _calculate_stats_for_matches(matches, team_name):
         except:
             continue
             
-        is_home_team = team_name.lower() in m.get('home', '').lower()
+        is_home_team = team_name_lower in m.get('home', '').lower()
         
         # W/D/L
         if is_home_team:
@@ -430,102 +382,24 @@ def _calculate_stats_for_matches(matches, team_name):
                 
     return stats
 
-def _build_historical_matches_list_html(home_matches, away_matches, home_team_name, away_team_name):
-    if not home_matches and not away_matches:
-        return ""
-
-    html = "<div class='historical-matches-container'><div class='row'>"
-
-    def build_table(matches, title, team_name, is_home_context):
-        if not matches: return ""
-        
-        stats = _calculate_stats_for_matches(matches, team_name)
-        
-        table_html = f"""
-        <div class="col-lg-6">
-            <div class="card mb-3">
-                <div class="card-header bg-light">
-                    <h6 class="mb-0"><strong>{title}</strong> <small class="text-muted">({team_name})</small></h6>
-                </div>
-                <div class="table-responsive">
-                    <table class="table table-sm table-hover mb-0" style="font-size: 0.85rem;">
-                        <thead class="table-light">
-                            <tr>
-                                <th>Liga</th>
-                                <th>Fecha</th>
-                                <th class="text-end">Local</th>
-                                <th class="text-center">Res</th>
-                                <th>Visitante</th>
-                                <th class="text-center">AH</th>
-
-                            </tr>
-                        </thead>
-                        <tbody>
-        """
-        
-        for m in matches:
-            date = m.get('date', '-')
-            league = m.get('league_id_hist', '-')
-            home = m.get('home', '-')
-            away = m.get('away', '-')
-            score = m.get('score', '-')
-            ah = m.get('ahLine', '-')
-            ou = m.get('ouLine', '-')
-            
-            # Highlight logic
-            home_class = "fw-bold text-primary" if team_name.lower() in home.lower() else ""
-            away_class = "fw-bold text-primary" if team_name.lower() in away.lower() else ""
-            
-            # Score coloring
-            score_style = "font-weight:bold;"
-            
-            table_html += f"""
-                        <tr>
-                            <td>{league}</td>
-                            <td>{date}</td>
-                            <td class="text-end {home_class}">{home}</td>
-                            <td class="text-center" style="{score_style}">{score}</td>
-                            <td class="{away_class}">{away}</td>
-                            <td class="text-center"><span class="badge bg-light text-dark border">{ah}</span></td>
-
-                        </tr>
-            """
-        
-        table_html += """
-                        </tbody>
-                    </table>
-                </div>
-                <div class="card-footer bg-white">
-                    <div class="d-flex justify-content-around text-center" style="font-size: 0.9rem;">
-        """
-        
-        # Add Stats
-        table_html += f"""
-                        <div>
-                            <span class="text-success fw-bold">V: {stats['W']}</span> | 
-                            <span class="text-muted fw-bold">E: {stats['D']}</span> | 
-                            <span class="text-danger fw-bold">D: {stats['L']}</span>
-                        </div>
-        """
-        
-
-            
-        table_html += """
-                    </div>
-                </div>
-            </div>
-        </div>
-        """
-        return table_html
-
+def _build_historical_tables(home_matches, away_matches, home_team_name, away_team_name):
+    """Datos de las tablas de historial (casa/fuera); el HTML lo pinta partials/historical_matches.html."""
+    tables = []
     if home_matches:
-        html += build_table(home_matches, "Partidos en Casa", home_team_name, True)
-    
+        tables.append({
+            'title': "Partidos en Casa",
+            'team_name': home_team_name,
+            'matches': home_matches,
+            'stats': _calculate_stats_for_matches(home_matches, home_team_name),
+        })
     if away_matches:
-        html += build_table(away_matches, "Partidos Fuera", away_team_name, False)
-
-    html += "</div></div>"
-    return html
+        tables.append({
+            'title': "Partidos Fuera",
+            'team_name': away_team_name,
+            'matches': away_matches,
+            'stats': _calculate_stats_for_matches(away_matches, away_team_name),
+        })
+    return tables
 
 # --- FUNCIONES DE EXTRACCIÓN DE DATOS ---
 def extract_vs_odds(soup):
@@ -828,13 +702,16 @@ def get_team_league_info_from_script_of(soup):
     league_name = find_val(r"lName:\s*'([^']*)'") or "N/A"
     return home_id, away_id, league_id, home_name, away_name, league_name
 
+_DATE_DDMMYYYY_RE = re.compile(r'(\d{2})-(\d{2})-(\d{4})')
+_DATE_YYYYMMDD_RE = re.compile(r'(\d{4})-(\d{2})-(\d{2})')
+
 def _parse_date_ddmmyyyy(d: str) -> tuple:
     # Intentar formato DD-MM-YYYY
-    m = re.search(r'(\d{2})-(\d{2})-(\d{4})', d or '')
+    m = _DATE_DDMMYYYY_RE.search(d or '')
     if m: return (int(m.group(3)), int(m.group(2)), int(m.group(1)))
     
     # Intentar formato YYYY-MM-DD
-    m2 = re.search(r'(\d{4})-(\d{2})-(\d{2})', d or '')
+    m2 = _DATE_YYYYMMDD_RE.search(d or '')
     if m2: return (int(m2.group(1)), int(m2.group(2)), int(m2.group(3)))
     
     return (1900, 1, 1)
@@ -847,6 +724,7 @@ def extract_recent_matches(soup, table_id, team_name, league_id, is_home_game, o
     if not soup or not (table := soup.find("table", id=table_id)): return []
     matches = []
     score_selector = 'fscore_1' if is_home_game else 'fscore_2'
+    team_name_lower = team_name.lower()
     
     # Iterar sobre las filas de la tabla
     for row in table.find_all("tr", id=re.compile(rf"tr{table_id[-1]}_\d+")):
@@ -857,8 +735,8 @@ def extract_recent_matches(soup, table_id, team_name, league_id, is_home_game, o
         # El usuario dijo "todos", así que quizás no filtramos por liga aquí, o lo hacemos opcional.
         # Pero mantengamos la lógica de "Home vs Home" y "Away vs Away" estricta.
         
-        is_team_home = team_name.lower() in details.get('home', '').lower()
-        is_team_away = team_name.lower() in details.get('away', '').lower()
+        is_team_home = team_name_lower in details.get('home', '').lower()
+        is_team_away = team_name_lower in details.get('away', '').lower()
         
         # Condición: El equipo analizado debe jugar en la condición especificada (Local o Visitante)
         if (is_home_game and is_team_home) or (not is_home_game and is_team_away):
@@ -1206,8 +1084,9 @@ def extract_h2h_data_of(soup, home_name, away_name, league_id=None, odds_map=Non
         'match6_id': most_recent.get('matchIndex'), 'h2h_gen_home': most_recent.get('home'), 'h2h_gen_away': most_recent.get('away'),
         'date': most_recent.get('date', 'N/A'), 'home_red': most_recent.get('home_red'), 'away_red': most_recent.get('away_red')
     })
+    home_name_lower, away_name_lower = home_name.lower(), away_name.lower()
     for d in all_matches:
-        if d['home'].lower() == home_name.lower() and d['away'].lower() == away_name.lower():
+        if d['home'].lower() == home_name_lower and d['away'].lower() == away_name_lower:
             results.update({
                 'ah1': d.get('ahLine', '-'), 'res1': d.get('score', '?:?'), 'res1_raw': d.get('score_raw', '?-?'),
                 'match1_id': d.get('matchIndex'), 'date': d.get('date', 'N/A'), 'home_red': d.get('home_red'), 'away_red': d.get('away_red')
@@ -1218,11 +1097,11 @@ def extract_h2h_data_of(soup, home_name, away_name, league_id=None, odds_map=Non
 def extract_comparative_match_of(soup, table_id, main_team, opponent, league_id, is_home_table, odds_map=None):
     if not opponent or opponent == "N/A" or not main_team or not (table := soup.find("table", id=table_id)): return None
     score_selector = 'fscore_1' if is_home_table else 'fscore_2'
+    main, opp = main_team.lower(), opponent.lower()
     for row in table.find_all("tr", id=re.compile(rf"tr{table_id[-1]}_\d+")):
         if not (details := get_match_details_from_row_of(row, score_class_selector=score_selector, source_table_type='hist', odds_map=odds_map)): continue
         if league_id and details.get('league_id_hist') and details.get('league_id_hist') != str(league_id): continue
         h, a = details.get('home','').lower(), details.get('away','').lower()
-        main, opp = main_team.lower(), opponent.lower()
         if (main == h and opp == a) or (main == a and opp == h):
             return {
                 "score": details.get('score', '?:?'), "ah_line": details.get('ahLine', '-'), "localia": 'H' if main == h else 'A',
@@ -1242,31 +1121,87 @@ def _load_main_match_soup(main_match_id: str):
 from pathlib import Path
 from modules.backtesting import BettingSimulator
 
-def load_cached_finished_matches():
-    """Carga los partidos finalizados desde data.json."""
+def _find_cached_data_file():
     # Intentar localizar data.json en directorios padres
     candidates = [
         Path(__file__).resolve().parent.parent.parent / 'data.json', # src/modules/../.. -> root
         Path("C:/Users/Usuario/Desktop/V_buena/data.json") # Absolute fallback
     ]
-    
-    data_file = None
     for c in candidates:
         if c.exists():
-            data_file = c
-            break
-            
+            return c
+    return None
+
+def _cached_data_file_signature():
+    """(ruta, mtime, tamaño) del data.json en uso, o None si no hay archivo."""
+    data_file = _find_cached_data_file()
     if not data_file:
+        return None
+    try:
+        stat = data_file.stat()
+    except OSError:
+        return None
+    return (str(data_file), stat.st_mtime_ns, stat.st_size)
+
+# Partidos finalizados de data.json, reutilizados mientras no cambien mtime ni tamaño.
+_finished_matches_cache = {'key': None, 'matches': []}
+_finished_matches_lock = threading.Lock()
+
+def load_cached_finished_matches():
+    """Carga los partidos finalizados desde data.json. La lista es compartida: no modificarla."""
+    signature = _cached_data_file_signature()
+    if signature is None:
         return []
+    with _finished_matches_lock:
+        if _finished_matches_cache['key'] == signature:
+            return _finished_matches_cache['matches']
 
     try:
-        with open(data_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return data.get('finished_matches', [])
+        data = _loads(Path(signature[0]).read_bytes())
+        matches = data.get('finished_matches', [])
     except Exception as e:
         print(f"Error loading data.json: {e}")
         return []
 
+    with _finished_matches_lock:
+        _finished_matches_cache['key'] = signature
+        _finished_matches_cache['matches'] = matches
+    return matches
+
+# Índice de patrones (AH, O/U) -> clones de data.json. Cada partido se formatea una sola
+# vez al construirlo y el índice se rehace solo cuando cambia el archivo.
+_clone_index_cache = {'key': None, 'index': {}}
+_clone_index_lock = threading.Lock()
+
+def _build_clone_pattern_index(finished_matches):
+    index = {}
+    for m in finished_matches:
+        if not isinstance(m, dict): continue
+        m_ah_raw = m.get('handicap')
+        m_ou_raw = m.get('goal_line')
+        if not m_ah_raw or not m_ou_raw: continue
+        # Misma función de formateo que la línea actual para asegurar consistencia
+        pattern = (format_ah_as_decimal_string_of(m_ah_raw), format_ah_as_decimal_string_of(m_ou_raw))
+        index.setdefault(pattern, []).append({
+            'score_raw': m.get('score'),
+            'match_id': m.get('id')
+        })
+    return index
+
+def get_clone_pattern_index():
+    """Índice de clones por patrón; compartido entre análisis, no debe modificarse."""
+    signature = _cached_data_file_signature()
+    if signature is None:
+        return {}
+    with _clone_index_lock:
+        if _clone_index_cache['key'] == signature:
+            return _clone_index_cache['index']
+    index = _build_clone_pattern_index(load_cached_finished_matches())
+    with _clone_index_lock:
+        _clone_index_cache['key'] = signature
+        _clone_index_cache['index'] = index
+    return index
+
 def analizar_partido_completo(match_id: str, force_refresh: bool = False):
     main_match_id = "".join(filter(str.isdigit, str(match_id)))
     if not main_match_id:
@@ -1373,32 +1308,12 @@ def analizar_partido_completo(match_id: str, force_refresh: bool = False):
 
         if ah_actual_num is not None and goles_actual_num is not None:
             # 1. Cargar clones globales
-            all_finished = load_cached_finished_matches()
-            global_clones = []
-            
             # Normalizar AH y OU actual para comparación
             target_ah_str = ah_actual_str
             target_ou_str = goles_actual_str
             
-            for m in all_finished:
-                # Normalizar handicap y goal_line del partido cacheado
-                m_ah_raw = m.get('handicap')
-                m_ou_raw = m.get('goal_line')
-                
-                if not m_ah_raw or not m_ou_raw: continue
-                
-                # Usamos la misma función de formateo para asegurar consistencia
-                m_ah_str = format_ah_as_decimal_string_of(m_ah_raw)
-                m_ou_str = format_ah_as_decimal_string_of(m_ou_raw)
-                
-                # CRITERIO DE PATRÓN ESTRICTO: AH + O/U deben coincidir
-                if m_ah_str == target_ah_str and m_ou_str == target_ou_str:
-                    # Es un clon!
-                    clone_data = {
-                        'score_raw': m.get('score'),
-                        'match_id': m.get('id')
-                    }
-                    global_clones.append(clone_data)
+            # CRITERIO DE PATRÓN ESTRICTO: AH + O/U deben coincidir
+            global_clones = list(get_clone_pattern_index().get((target_ah_str, target_ou_str), ()))
             
             # 2. Simular
             if global_clones:
@@ -1413,21 +1328,39 @@ def analizar_partido_completo(match_id: str, force_refresh: bool = False):
         return {"error": f"Error durante el análisis: {exc}"}
 
     market_analysis_html = generar_analisis_completo_mercado(main_match_odds_data, h2h_data, home_name, away_name)
-    historical_matches_html = _build_historical_matches_list_html(recent_home_matches, recent_away_matches, home_name, away_name)
+    historical_tables = _build_historical_tables(recent_home_matches, recent_away_matches, home_name, away_name)
 
     def get_stats_rows(match_id_value):
         if not match_id_value:
             return []
         df = get_match_progression_stats_data(str(match_id_value))
-        return _df_to_rows(df)
-
-    last_home_match_stats = get_stats_rows((last_home_match or {}).get('match_id'))
-    last_away_match_stats = get_stats_rows((last_away_match or {}).get('match_id'))
-    h2h_col3_stats = get_stats_rows((details_h2h_col3 or {}).get('match_id'))
-    comp_L_vs_UV_A_stats = get_stats_rows((comp_L_vs_UV_A or {}).get('match_id'))
-    comp_V_vs_UL_H_stats = get_stats_rows((comp_V_vs_UL_H or {}).get('match_id'))
-    h2h_stadium_stats = get_stats_rows(h2h_data.get('match1_id'))
-    h2h_general_stats = get_stats_rows(h2h_data.get('match6_id'))
+        return df_to_rows(df)
+
+    stats_match_ids = [
+        (last_home_match or {}).get('match_id'),
+        (last_away_match or {}).get('match_id'),
+        (details_h2h_col3 or {}).get('match_id'),
+        (comp_L_vs_UV_A or {}).get('match_id'),
+        (comp_V_vs_UL_H or {}).get('match_id'),
+        h2h_data.get('match1_id'),
+        h2h_data.get('match6_id'),
+    ]
+    # Las descargas de estadísticas son independientes: se solapan en vez de esperar
+    # una tras otra, y un mismo partido solo se pide una vez.
+    unique_stats_ids = list(dict.fromkeys(mid for mid in stats_match_ids if mid))
+    stats_rows_by_id = {}
+    if unique_stats_ids:
+        with ThreadPoolExecutor(max_workers=min(STATS_FETCH_MAX_WORKERS, len(unique_stats_ids))) as pool:
+            stats_rows_by_id = dict(zip(unique_stats_ids, pool.map(get_stats_rows, unique_stats_ids)))
+    (
+        last_home_match_stats,
+        last_away_match_stats,
+        h2h_col3_stats,
+        comp_L_vs_UV_A_stats,
+        comp_V_vs_UL_H_stats,
+        h2h_stadium_stats,
+        h2h_general_stats,
+    ) = (stats_rows_by_id.get(mid, []) if mid else [] for mid in stats_match_ids)
 
     results = {
         "match_id": main_match_id,
@@ -1445,7 +1378,7 @@ def analizar_partido_completo(match_id: str, force_refresh: bool = False):
             "goals_linea": format_ah_as_decimal_string_of(main_match_odds_data.get('goals_linea_raw', '?'))
         },
         "market_analysis_html": market_analysis_html,
-        "historical_matches_html": historical_matches_html,
+        "historical_tables": historical_tables,
         "last_home_match": {**last_home_match, "stats_rows": last_home_match_stats} if last_home_match else None,
         "last_away_match": {**last_away_match, "stats_rows": last_away_match_stats} if last_away_match else None,
         "h2h_col3": {